@@ -1,5 +1,6 @@
 from gene_symbol_updater.hgnc import hgnc_approved_symbol, symbol_ids_table, update_hgnc_table
 from gene_symbol_updater.ncbi import entrez_name_id, set_Entrez_email, update_ncbiOldIdTable
+from gene_symbol_updater.prefilter import get_symbol_filter
 
 
 import pandas as pd
@@ -18,7 +19,8 @@ if not os.path.isfile(resource_filename(__name__, "data/NCBI_oldId_to_newId.csv"
 __all__ = ['update_gene_symbols']
 
 # todo this should just return a single DF, with 3rd col indicating status, i.e. MISSING/ENTREZ/HGNC/NOCHANGE
-def update_gene_symbols(gset:np.ndarray, search_NCBI=True, email=None, ) -> dict:
+def update_gene_symbols(gset:np.ndarray, search_NCBI=True, email=None,
+                        prefilter=None) -> dict:
     """Returns a map of original names to udpated, array of ambiguous names,
     and array of genes not found in HGNC or Entrez databases.
 
@@ -28,6 +30,9 @@ def update_gene_symbols(gset:np.ndarray, search_NCBI=True, email=None, ) -> dict
         'ambiguous': np.ndarray. Genes with multiple possible values according
             to HGNC database.
         'no_hits': Genes not found in either the HGNC or NCBI databases.
+        'prefiltered': pd.Series. Reason for rejection indexed by queries the
+            prefilter kept from NCBI. These are also in no_hits.
+        'prefiltered_counts': dict. Number of queries rejected for each reason.
 
     Final Series has original name when no other is found
 
@@ -36,6 +41,13 @@ def update_gene_symbols(gset:np.ndarray, search_NCBI=True, email=None, ) -> dict
         search_NCBI: if True genes not found in HGNC table will be
             searched against the NCBI database
         email: your email to be used when querying NCBI
+        prefilter: strictness of the check that stops strings that can't be
+            gene symbols being searched against NCBI, one of 'lenient',
+            'normal' or 'strict'. Default None searches everything. Rejected
+            queries go straight to no_hits. 'lenient' only rejects strings
+            that can't be symbols; 'normal' and 'strict' can also reject
+            NCBI-only names, e.g. clone based names like WI2-2373I1.2. See
+            prefilter.SymbolFilter.
     """
 
     if email:
@@ -49,8 +61,13 @@ def update_gene_symbols(gset:np.ndarray, search_NCBI=True, email=None, ) -> dict
     ambiguous = found.loc[found.apply(lambda x: (type(x) is list) or (type(x) is np.ndarray))].index
     print('Ambiguous:', len(ambiguous))
 
+    prefiltered = pd.Series(dtype=object)
     if search_NCBI:
         nfm = found.isna()
+        if prefilter:
+            keep, prefiltered = get_symbol_filter().check(found.index[nfm], prefilter)
+            print('Not gene-like, skipping NCBI:', len(prefiltered))
+            nfm.loc[nfm] = keep
         print('Searching NCBI for:', nfm.sum())
         found.loc[nfm] = found.loc[nfm].index.map(lambda g: entrez_name_id(g, null_value=np.nan)[0])
         # take the raw array so we can apply it to the index directly
@@ -58,5 +75,7 @@ def update_gene_symbols(gset:np.ndarray, search_NCBI=True, email=None, ) -> dict
     print("No result for :", sum(nfm))
     no_hits = found.index[nfm].values
     found.loc[nfm] = found.index[nfm].values
-    return {'genes':found, 'ambiguous':ambiguous, 'no_hits':no_hits}
+    return {'genes':found, 'ambiguous':ambiguous, 'no_hits':no_hits,
+            'prefiltered':prefiltered,
+            'prefiltered_counts':prefiltered.value_counts().to_dict()}
 
@@ -0,0 +1,176 @@
+import string
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from gene_symbol_updater import hgnc, ncbi
+
+import logging
+LOG = logging.getLogger(__name__)
+
+STRICTNESS = ('lenient', 'normal', 'strict')
+
+# characters NCBI uses in symbols, e.g. clone based names like WI2-2373I1.2,
+#   allowed whether or not they turn up in HGNC
+NCBI_CHARS = set(string.ascii_uppercase + string.digits + '-.')
+ALPHANUMERIC = set(string.ascii_uppercase + string.digits)
+
+
+def symbol_shape(s:str) -> str:
+    """Collapse a symbol to its character shape. Letters become 'A', digits
+    become '9', anything else is kept, then runs of the same class are
+    collapsed. Case is ignored, so 'C1orf112' and 'C1ORF112' both give
+    'A9A9'."""
+    shape = []
+    for c in s.upper():
+        if c in string.ascii_uppercase:
+            c = 'A'
+        elif c in string.digits:
+            c = '9'
+        if not shape or shape[-1] != c:
+            shape.append(c)
+    return ''.join(shape)
+
+
+class SymbolFilter:
+    """Character-shape model of the known symbol universe, used to spot
+    queries that can't be gene symbols before they're sent to NCBI.
+
+    Built from HGNC approved, previous and alias symbols plus LOC{id} names
+    for the NCBI IDs held locally. Strictness levels, each including the
+    checks of the ones before it:
+        'lenient': there must be a letter, characters must be ones used by
+            NCBI or seen in known symbols, the query must start and end with
+            a letter or number (or a character known symbols start/end
+            with), and no hyphen separated part can be longer than the
+            longest known one. Only rejects strings that can't be symbols.
+        'normal': each hyphen separated part of the query must have a shape
+            seen in known symbols (or their parts), so readthroughs of
+            HGNC-like symbols get through.
+        'strict': the shape and length of the whole query must be seen in
+            known symbols.
+    'normal' and 'strict' compare shapes against HGNC-derived symbols, so
+    they can reject NCBI-only names, e.g. clone based names like
+    'WI2-2373I1.2'; 'strict' rejects these unless HGNC has the same shape.
+    """
+
+    def __init__(self, symbols):
+        self.chars = set(NCBI_CHARS)
+        self.first_chars = set(ALPHANUMERIC)
+        self.last_chars = set(ALPHANUMERIC)
+        self.shapes = set()
+        self.part_shapes = set()
+        self.max_len = 0
+        self.max_part_len = 0
+
+        for s in symbols:
+            if type(s) is not str or not s:
+                continue
+            s = s.upper()
+            parts = s.split('-')
+            self.chars.update(s)
+            self.first_chars.add(s[0])
+            self.last_chars.add(s[-1])
+            self.max_len = max(self.max_len, len(s))
+            self.max_part_len = max(self.max_part_len, *map(len, parts))
+            self.shapes.add(symbol_shape(s))
+            self.part_shapes.update(symbol_shape(p) for p in parts)
+
+    def rejection_reason(self, query, strictness='lenient'):
+        """Return the reason a query can't be a gene symbol, or None if it
+        might be one."""
+        if strictness not in STRICTNESS:
+            raise ValueError(f"strictness must be one of {STRICTNESS}, got {strictness}")
+        if type(query) is not str or not query:
+            return 'not a string'
+        q = query.upper()
+        if not any(c in string.ascii_uppercase for c in q):
+            return 'no letters'
+        if not self.chars.issuperset(q):
+            return 'unknown characters'
+        if q[0] not in self.first_chars or q[-1] not in self.last_chars:
+            return 'bad first or last character'
+        parts = q.split('-')
+        if max(map(len, parts)) > self.max_part_len:
+            return 'too long'
+        if strictness == 'lenient':
+            return None
+        if not all(symbol_shape(p) in self.part_shapes for p in parts):
+            return 'unknown shape'
+        if strictness == 'normal':
+            return None
+        if len(q) > self.max_len:
+            return 'too long'
+        if symbol_shape(q) not in self.shapes:
+            return 'unknown shape'
+        return None
+
+    def could_be_gene(self, query, strictness='lenient') -> bool:
+        return self.rejection_reason(query, strictness) is None
+
+    def check(self, queries, strictness='lenient') -> (np.ndarray, pd.Series):
+        """Check many queries at once. Returns a boolean array, True where the
+        query might be a gene, and a Series of rejection reasons indexed by
+        the rejected queries."""
+        reasons = [self.rejection_reason(q, strictness) for q in queries]
+        keep = np.array([r is None for r in reasons], dtype=bool)
+        rejected = pd.Series([r for r in reasons if r is not None],
+                             index=[q for q, r in zip(queries, reasons) if r is not None],
+                             dtype=object)
+        LOG.info(f"Rejected {(~keep).sum()} of {len(keep)} queries: "
+                 f"{dict(Counter(rejected.values))}")
+        return keep, rejected
+
+
+def known_symbols():
+    """All symbols the filter is built from: HGNC approved, previous and
+    alias symbols, and LOC names for NCBI gene IDs in the local tables."""
+    symbols = set(hgnc.approved)
+    symbols.update(hgnc.alt_symbols.keys())
+    ncbi_ids = set(hgnc.symbol_ids_table.NCBI_gene_ID)
+    ncbi_ids.update(ncbi.ncbiOldIdTable.index.astype(str))
+    ncbi_ids.update(ncbi.ncbiOldIdTable.GeneId.dropna())
+    symbols.update(f"LOC{i}" for i in ncbi_ids if i.isdigit())
+    return symbols
+
+
+_symbol_filter = None
+_filter_tables = ()
+def get_symbol_filter() -> SymbolFilter:
+    """Return a SymbolFilter built from the current lookup tables, reusing
+    the one built earlier unless the tables have been reloaded since."""
+    global _symbol_filter, _filter_tables
+    tables = (hgnc.approved, hgnc.alt_symbols, hgnc.symbol_ids_table, ncbi.ncbiOldIdTable)
+    if (_symbol_filter is None) or not all(a is b for a, b in zip(tables, _filter_tables)):
+        _symbol_filter = SymbolFilter(known_symbols())
+        _filter_tables = tables
+    return _symbol_filter
+
+
+def test_filter():
+    # small universe so this doesn't depend on the downloaded tables
+    filt = SymbolFilter(['BRCA1', 'C1orf112', 'HLA-DRB1', 'MAGEA10', 'MAGEA5',
+                         'PHOSPHO2-KLHL23', 'LOC653602'])
+    kept = ['MAGEA10-MAGEA5', 'LOC653602', 'WI2-2373I1.2', 'brca2']
+    rejected = {'-09sdf0qnroif-sod': 'bad first or last character',
+                '1234': 'no letters',
+                'Non-Targeting_Control_0001': 'unknown characters',
+                'MAGEA10MAGEA5MAGEA10': 'too long'}
+    for strictness in STRICTNESS:
+        for g, reason in rejected.items():
+            assert filt.rejection_reason(g, strictness) == reason, (g, strictness)
+    for g in kept:
+        assert filt.could_be_gene(g), g
+    # readthroughs are judged on their parts, so longer than any known symbol is fine
+    assert filt.could_be_gene('PHOSPHO2-KLHL23-MAGEA10', 'normal')
+    assert filt.rejection_reason('PHOSPHO2-KLHL23-MAGEA10', 'strict') == 'too long'
+    # clone based names have shapes HGNC doesn't use
+    assert filt.rejection_reason('WI2-2373I1.2', 'normal') == 'unknown shape'
+    assert filt.rejection_reason('WI2-2373I1.2', 'strict') == 'unknown shape'
+    for g in ['MAGEA10-MAGEA5', 'LOC653602', 'brca2']:
+        assert filt.could_be_gene(g, 'strict'), g
+
+    keep, reasons = filt.check(kept + list(rejected))
+    assert keep.tolist() == [True]*len(kept) + [False]*len(rejected)
+    assert reasons.to_dict() == rejected